@@ -4,6 +4,7 @@ Run: uvicorn hybridtablerag.api.main:app --reload --port 8000
 """
 from __future__ import annotations
 
+import logging
 import os
 import sys
 from contextlib import asynccontextmanager
@@ -18,6 +19,8 @@ _project_root = str(Path(__file__).resolve().parent.parent.parent)
 if _project_root not in sys.path:
     sys.path.insert(0, _project_root)
 
+log = logging.getLogger(__name__)
+
 
 # Shared Application State
 
@@ -74,16 +77,16 @@ async def lifespan(app: FastAPI):
 
         # LLM client (reads LLM_PROVIDER, *_API_KEY from .env)
         app_state.llm = get_llm()
-        print("[Startup] LLM initialised")
+        log.info("LLM initialised")
 
         # DuckDB
         db_path = os.getenv("DUCKDB_PATH", "data/hybridtablerag.duckdb")
         app_state.store = DuckDBStore(db_path=db_path)
-        print(f"[Startup] DuckDB connected: {app_state.store.db_path}")
+        log.info("DuckDB connected: %s", app_state.store.db_path)
 
         # Conversation history
         app_state.context_store = ContextStore(app_state.store.conn)
-        print("[Startup] ContextStore ready")
+        log.info("ContextStore ready")
 
         # SQL generator
         app_state.sql_generator = LLMSQLGenerator(llm=app_state.llm)
@@ -92,29 +95,31 @@ async def lifespan(app: FastAPI):
         try:
             from hybridtablerag.storage.vectors import VectorStore, get_embedding_provider
             provider = get_embedding_provider()
-            vs = VectorStore(app_state.store.conn, provider)
+            # Opt-in: vss persistence has no WAL recovery for HNSW indexes
+            persist_hnsw = os.getenv("HNSW_PERSISTENCE", "false").lower() in ("1", "true", "yes")
+            vs = VectorStore(app_state.store.conn, provider, persist_hnsw=persist_hnsw)
             vs.setup()
             app_state.vector_store = vs
-            print("[Startup] VectorStore ready")
+            log.info("VectorStore ready")
         except Exception as ve:
-            print(f"[Startup] VectorStore not available: {ve} (continuing without it)")
+            log.warning("VectorStore not available: %s (continuing without it)", ve)
 
         # Restore orchestrator if tables exist from previous session
         existing_tables = app_state.store.list_tables()
         non_system = [t for t in existing_tables if not t.startswith("chat_history")]
         if non_system:
             _rebuild_orchestrator(non_system, [], non_system[0])
-            print(f"[Startup] Restored orchestrator for tables: {non_system}")
+            log.info("Restored orchestrator for tables: %s", non_system)
 
     except Exception as e:
-        print(f"[Startup ERROR] {e}")
+        log.error("Startup failed: %s", e)
 
     yield   # App runs here
 
     # Shutdown
     if app_state.store:
         app_state.store.close()
-        print("[Shutdown] DuckDB closed")
+        log.info("DuckDB closed")
 
 
 # FastAPI App
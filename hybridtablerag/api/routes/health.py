@@ -6,7 +6,6 @@ GET /health — liveness + readiness check.
 from fastapi import APIRouter
 from hybridtablerag.api.models import HealthResponse
 from hybridtablerag.api.main import app_state
-from hybridtablerag.storage.utils import _escape_identifier
 
 router = APIRouter()
 
@@ -20,14 +19,7 @@ async def health_check():
         if app_state.store and app_state.store.conn:
             tables = app_state.store.list_tables()
             non_system = [t for t in tables if t != "chat_history"]
-            for t in non_system:
-                try:
-                    n = app_state.store.conn.execute(
-                        f"SELECT COUNT(*) FROM {_escape_identifier(t)}"
-                    ).fetchone()[0]
-                    row_counts[t] = int(n)
-                except Exception:
-                    row_counts[t] = -1
+            row_counts = app_state.store.get_row_counts(non_system)
             duckdb_ok = True
     except Exception:
         pass
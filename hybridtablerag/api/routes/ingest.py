@@ -166,6 +166,8 @@ async def ingest_file(
                         pk_column=pk_col,
                         bts_log=norm_log,
                     )
+                    # embed_table adds the embedding column directly on the connection
+                    app_state.store.invalidate_schema_cache()
             except Exception as ve:
                 norm_log.append(f"[{sheet_name_key}] Vector embedding skipped: {ve}")
 
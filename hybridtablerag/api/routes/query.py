@@ -7,26 +7,15 @@ from __future__ import annotations
 from fastapi import APIRouter
 from hybridtablerag.api.main import app_state
 from hybridtablerag.api.models import QueryRequest, QueryResponse
-import datetime
-from decimal import Decimal
-from typing import Any, Dict, List
+from hybridtablerag.storage.schema import _safe_val
+from typing import Dict, List
 
 router = APIRouter()
 
 
 def _safe_records(records: List[Dict]) -> List[Dict]:
     """Make DataFrame records JSON-serializable."""
-    def _safe(v: Any) -> Any:
-        if v is None: return None
-        if isinstance(v, (datetime.date, datetime.datetime)): return v.isoformat()
-        if isinstance(v, Decimal): return float(v)
-        try:
-            import numpy as np
-            if isinstance(v, (np.integer, np.floating)): return v.item()
-        except ImportError:
-            pass
-        return v
-    return [{k: _safe(val) for k, val in row.items()} for row in records]
+    return [{k: _safe_val(val) for k, val in row.items()} for row in records]
 
 
 @router.post("/", response_model=QueryResponse)
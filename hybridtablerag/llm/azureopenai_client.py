@@ -1,6 +1,5 @@
 import os
 from dotenv import load_dotenv
-from openai import AzureOpenAI
 from hybridtablerag.llm.base import BaseLLM
 
 load_dotenv()
@@ -25,6 +24,7 @@ class AzureOpenAIClient(BaseLLM):
         if not deployment:
             raise ValueError("AZURE_OPENAI_DEPLOYMENT not found. Check your .env file.")
 
+        from openai import AzureOpenAI
         self.deployment_name = deployment
         self.client = AzureOpenAI(
             api_key=api_key,
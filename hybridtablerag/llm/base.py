@@ -1,7 +1,19 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 
 class BaseLLM(ABC):
 
     @abstractmethod
     def generate(self, prompt: str) -> str:
-        pass
\ No newline at end of file
+        pass
+
+    def generate_batch(self, prompts: List[str], max_workers: int = 8) -> List[str]:
+        """
+        Run several prompts concurrently; results keep the input order.
+        The clients are blocking HTTP calls, so threads overlap network latency.
+        """
+        if len(prompts) <= 1:
+            return [self.generate(p) for p in prompts]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(prompts))) as pool:
+            return list(pool.map(self.generate, prompts))
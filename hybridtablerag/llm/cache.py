@@ -0,0 +1,55 @@
+"""
+llm/cache.py
+============
+Response cache around any BaseLLM client.
+
+All clients call the model with temperature=0, so an identical prompt to
+the same model is answered from memory instead of paying for the tokens again.
+Callers that reject an answer (failed SQL) call invalidate() so a retry
+reaches the model instead of getting the same answer back.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from hybridtablerag.llm.base import BaseLLM
+
+
+class CachedLLM(BaseLLM):
+
+    def __init__(self, llm: BaseLLM, max_entries: int = 256):
+        self.llm = llm
+        self.max_entries = max_entries
+        self.model_name = getattr(llm, "model_name", None) or getattr(llm, "deployment_name", "")
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, prompt: str) -> str:
+        return hashlib.blake2b(
+            f"{self.model_name}\x00{prompt}".encode(), digest_size=16
+        ).hexdigest()
+
+    def generate(self, prompt: str) -> str:
+        key = self._key(prompt)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        response = self.llm.generate(prompt)
+
+        with self._lock:
+            self._cache[key] = response
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return response
+
+    def invalidate(self, prompt: str) -> None:
+        """Drop the cached answer for prompt, e.g. SQL that failed to run."""
+        with self._lock:
+            self._cache.pop(self._key(prompt), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
@@ -15,6 +15,17 @@ if _env_path.exists():
 
 
 def get_llm():
+    llm = _get_provider_llm()
+
+    # Optional response cache
+    cache_size = int(os.getenv("LLM_CACHE_SIZE", "0"))
+    if cache_size > 0:
+        from hybridtablerag.llm.cache import CachedLLM
+        return CachedLLM(llm, max_entries=cache_size)
+    return llm
+
+
+def _get_provider_llm():
     provider = os.getenv("LLM_PROVIDER", "openai").strip().lower()
     
     # Gemini 
@@ -6,7 +6,6 @@ in the google-generativeai SDK.  Correct method is model.generate_content().
 """
 
 import os
-import google.generativeai as genai
 from hybridtablerag.llm.base import BaseLLM
 
 
@@ -17,6 +16,7 @@ class GeminiClient(BaseLLM):
         if not api_key:
             raise ValueError("GEMINI_API_KEY not set in environment or passed explicitly.")
 
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
 
         # Store model name for re-use
@@ -1,13 +1,14 @@
-import ollama
 from hybridtablerag.llm.base import BaseLLM
 
 class OllamaClient(BaseLLM):
 
     def __init__(self, model_name: str = "qwen2.5:14b"):
+        import ollama
+        self.client = ollama.Client()
         self.model_name = model_name
 
     def generate(self, prompt: str) -> str:
-        response = ollama.chat(
+        response = self.client.chat(
             model=self.model_name,
             messages=[{"role": "user", "content": prompt}],
             options={"temperature": 0}
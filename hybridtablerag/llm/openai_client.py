@@ -1,6 +1,5 @@
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
 from hybridtablerag.llm.base import BaseLLM
 
 load_dotenv()
@@ -13,6 +12,7 @@ class OpenAIClient(BaseLLM):
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found. Check your .env file.")
         
+        from openai import OpenAI
         self.client = OpenAI(api_key=api_key)
         self.model_name = model_name
 
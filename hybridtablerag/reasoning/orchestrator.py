@@ -91,6 +91,7 @@ class QueryOrchestrator:
 
         self._schema_ctx = None  # cached
         self._schema_cached_at = None  
+        self._schema_version = None  # store.schema_version the cache was built at
 
     def invalidate_schema_cache(self):
         """
@@ -98,14 +99,20 @@ class QueryOrchestrator:
         """
         self._schema_ctx = None
         self._schema_cached_at = None
+        self._schema_version = None
 
     def _build_schema_ctx(self, bts_log, max_age_seconds: int = 300):
         """
-        Build or return cached schema context.
+        Build or return cached schema context. Profiling scans every column,
+        so the result is reused until the store reports a write or it ages out.
         """
         now = time.time()
-        # Rebuild if cache is empty or stale
-        if self._schema_ctx is None or (self._schema_cached_at and now - self._schema_cached_at > max_age_seconds):
+        # Rebuild if cache is empty, stale, or tables changed since it was built
+        if (
+            self._schema_ctx is None
+            or self._schema_version != self.store.schema_version
+            or (self._schema_cached_at and now - self._schema_cached_at > max_age_seconds)
+        ):
             bts_log.append("Building schema context")
             self._schema_ctx = build_multi_table_schema_context(
                 self.conn,
@@ -114,6 +121,7 @@ class QueryOrchestrator:
                 bts_log=bts_log,
             )
             self._schema_cached_at = now
+            self._schema_version = self.store.schema_version
         return self._schema_ctx
 
 
@@ -145,6 +153,7 @@ Current question:
 
         for attempt in range(1, self.SQL_MAX_RETRIES + 1):
             bts_log.append(f"⚙️ SQL attempt {attempt}")
+            gen = None
 
             try:
                 gen = self.sql_generator.generate_sql(
@@ -168,7 +177,16 @@ Current question:
             except Exception as e:
                 last_error = str(e)
                 bts_log.append(f"SQL error (attempt {attempt}): {e}")
-                
+                # Generated SQL that failed here would come back from a
+                # cached LLM on the next attempt
+                if gen is not None:
+                    self.sql_generator.invalidate(
+                        query,
+                        schema_ctx,
+                        self.relationships,
+                        reasoning,
+                    )
+
                 if attempt < self.SQL_MAX_RETRIES:
                     backoff = 0.5 * (2 ** (attempt - 1))  # 0.5s, 1s, 2s...
                     bts_log.append(f"Retrying in {backoff}s...")
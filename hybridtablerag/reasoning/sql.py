@@ -17,6 +17,14 @@ FORBIDDEN_KEYWORDS = [
     "ALTER", "TRUNCATE", "CREATE", "REPLACE",
 ]
 
+# One alternation scans the statement once instead of once per keyword;
+# IGNORECASE avoids upper-casing a copy of the whole statement
+_FORBIDDEN_RE = re.compile(
+    r"\b(?:" + "|".join(FORBIDDEN_KEYWORDS) + r")\b", re.IGNORECASE
+)
+_SINGLE_QUOTED_RE = re.compile(r"'[^']*'")
+_DOUBLE_QUOTED_RE = re.compile(r'"[^"]*"')
+
 
 class SQLValidator:
     @staticmethod
@@ -26,39 +34,36 @@ class SQLValidator:
         """
         # Remove string literals to avoid matching keywords inside values
         # e.g., WHERE status = 'DELETE' should not trigger forbidden check
-        sql_no_strings = re.sub(r"'[^']*'", "''", sql)
-        sql_no_strings = re.sub(r'"[^"]*"', '""', sql_no_strings)  # Handle double-quoted strings
-        sql_upper = sql_no_strings.upper()
+        sql_no_strings = _SINGLE_QUOTED_RE.sub("''", sql)
+        sql_no_strings = _DOUBLE_QUOTED_RE.sub('""', sql_no_strings)  # Handle double-quoted strings
 
-        # Allow WITH ... SELECT patterns (CTEs)
-        stripped = sql_upper.strip()
-        if not (stripped.startswith("SELECT") or stripped.startswith("WITH")):
+        # Allow WITH ... SELECT patterns (CTEs); only the prefix is upper-cased
+        prefix = sql_no_strings.lstrip()[:6].upper()
+        if not (prefix.startswith("SELECT") or prefix.startswith("WITH")):
             raise ValueError("Only SELECT statements (with optional CTEs) are allowed.")
 
         # Check forbidden keywords only in non-string context
-        for keyword in FORBIDDEN_KEYWORDS:
-            # Use word boundary + check it's not inside a string/comment
-            if re.search(rf"\b{keyword}\b", sql_upper):
-                # Double-check: is this keyword inside a string literal in the original?
-                # Simple heuristic: count quotes before the match
-                match = re.search(rf"\b{keyword}\b", sql_upper)
-                if match:
-                    pos = match.start()
-                    # Count single quotes before this position in original sql
-                    before = sql[:pos]
-                    single_quotes = before.count("'") - before.count("\\'")
-                    # If odd number of quotes, we're inside a string — allow it
-                    if single_quotes % 2 == 0:
-                        raise ValueError(f"Forbidden SQL keyword detected: {keyword}")
+        for match in _FORBIDDEN_RE.finditer(sql_no_strings):
+            # Double-check: is this keyword inside a string literal in the original?
+            # Simple heuristic: count quotes before the match
+            pos = match.start()
+            # Count single quotes before this position in original sql
+            before = sql[:pos]
+            single_quotes = before.count("'") - before.count("\\'")
+            # If odd number of quotes, we're inside a string — allow it
+            if single_quotes % 2 == 0:
+                raise ValueError(f"Forbidden SQL keyword detected: {match.group(0).upper()}")
 
 
 # SQL cleanup
 
+# Markdown code fence, with an optional sql/json language tag
+_FENCE_RE = re.compile(r"```(?:(?:sql|json)\b)?", re.IGNORECASE)
+
+
 def clean_sql(raw: str) -> str:
-    sql = raw.strip()
     # Remove markdown code fences
-    sql = re.sub(r"^```(?:sql)?\s*\n?", "", sql, flags=re.IGNORECASE)
-    sql = re.sub(r"\n?```\s*$", "", sql).strip()
+    sql = _FENCE_RE.sub("", raw).strip()
     # Remove leading "sql" keyword if present
     if sql.lower().startswith("sql"):
         sql = sql[3:].strip()
@@ -99,67 +104,87 @@ def _fix_duckdb_date_arithmetic(sql: str) -> tuple[str, list[str]]:
 
 # Schema formatter (supports multi-table)
 
+def _schema_tables(schema_metadata) -> list:
+    """
+    Accept either a list of table contexts or the multi-table context
+    dict from build_multi_table_schema_context().
+    """
+    if isinstance(schema_metadata, dict):
+        return schema_metadata.get("tables", [])
+    return schema_metadata
+
+
+# Long free-text sample values (descriptions, notes) are cut to this many
+# chars; categorical values are never cut
+PROMPT_VALUE_MAX_CHARS = 60
+
+
+def _short(value) -> str:
+    text = str(value)
+    if len(text) > PROMPT_VALUE_MAX_CHARS:
+        return text[:PROMPT_VALUE_MAX_CHARS] + "…"
+    return text
+
+
 def _format_schema_for_prompt(schema_metadata: list) -> str:
+    """
+    One line per column; nulls are only mentioned when present. Kept terse
+    because every schema token is re-sent with each question.
+    """
     lines = []
 
-    for table in schema_metadata:
+    for table in _schema_tables(schema_metadata):
         lines.append(
             f"Table: {table['table_name']} ({table.get('row_count', '?')} rows)"
         )
 
         for col in table.get("columns", []):
-            name      = col["name"]
-            col_type  = col["type"]
-            null_cnt  = col.get("null_count", 0)
-            null_note = f"nulls: {null_cnt}" if null_cnt > 0 else "no nulls"
-
-            lines.append(f"  {name} ({col_type}) | {null_note}")
+            line     = f"  {col['name']} ({col['type']})"
+            null_cnt = col.get("null_count", 0)
+            if null_cnt > 0:
+                line += f" | nulls: {null_cnt}"
 
             if col.get("all_values"):
+                # Verbatim: the model copies these into WHERE col = '...'
                 val_str = ", ".join(
                     f"{v['value']} ({v['count']})"
                     for v in col["all_values"]
                 )
-                lines.append(f"    values: {val_str}")
+                line += f" | values: {val_str}"
 
             elif col.get("range"):
                 r = col["range"]
-                lines.append(f"    range: {r['min']} → {r['max']}")
+                line += f" | range: {r['min']} → {r['max']}"
 
             elif col.get("sample_values"):
-                lines.append(f"    samples: {', '.join(str(v) for v in col['sample_values'])}")
+                line += f" | samples: {', '.join(_short(v) for v in col['sample_values'])}"
+
+            lines.append(line)
 
     return "\n".join(lines)
 
 
-# LLM SQL Generator
-class LLMSQLGenerator:
-
-    def __init__(self, llm: BaseLLM):
-        self.llm = llm
+def _unique_join_paths(relationships: list) -> list:
+    """
+    Drop relationships that repeat a join path already seen. A = B and
+    B = A are the same path, so the key is the unordered endpoint pair.
+    """
+    seen = set()
+    unique = []
+    for r in relationships:
+        key = frozenset({
+            (r["from_table"], r["from_column"]),
+            (r["to_table"], r["to_column"]),
+        })
+        if key not in seen:
+            seen.add(key)
+            unique.append(r)
+    return unique
 
-    # ------------------------------------------------------------------
-    def _build_prompt(
-        self,
-        user_query: str,
-        schema_metadata,
-        relationships,
-        reasoning: bool = False,
-    ) -> str:
-        if reasoning:
-            output_instruction = """
-Return valid JSON:
-{
-  "reasoning": "...",
-  "sql_query": "..."
-}
-"""
-        else:
-            output_instruction = "Return ONLY SQL."
 
-        schema_block = _format_schema_for_prompt(schema_metadata)
+# Prompt templates
 
-        prompt = f"""
+SQL_PROMPT = """
 You are a senior data engineer writing DuckDB SQL.
 
 STRICT RULES:
@@ -175,17 +200,68 @@ Schema:
 {schema_block}
 """
 
+REASONING_OUTPUT_INSTRUCTION = """
+Return valid JSON:
+{
+  "reasoning": "...",
+  "sql_query": "..."
+}
+"""
+
+SQL_OUTPUT_INSTRUCTION = "Return ONLY SQL."
+
+
+# LLM SQL Generator
+class LLMSQLGenerator:
+
+    def __init__(self, llm: BaseLLM):
+        self.llm = llm
+        # (schema_metadata, relationships, schema_block, joins_block) of the
+        # last prompt; the orchestrator reuses the same objects between calls
+        self._schema_cache = None
+
+    # ------------------------------------------------------------------
+    def _schema_blocks(self, schema_metadata, relationships) -> tuple[str, str]:
+        """
+        Return the formatted schema and JOIN-path blocks, reusing the last
+        result while the caller keeps passing the same objects.
+        """
+        cached = self._schema_cache
+        if cached and cached[0] is schema_metadata and cached[1] is relationships:
+            return cached[2], cached[3]
+
+        schema_block = _format_schema_for_prompt(schema_metadata)
+
+        joins_block = ""
         if relationships:
-            rel_lines = []
-            for r in relationships:
-                rel_lines.append(
-                    f"{r['from_table']}.{r['from_column']} = "
-                    f"{r['to_table']}.{r['to_column']}"
-                )
+            rel_lines = [
+                f"{r['from_table']}.{r['from_column']} = "
+                f"{r['to_table']}.{r['to_column']}"
+                for r in _unique_join_paths(relationships)
+            ]
+
+            joins_block = "\nAvailable JOIN paths:\n" + "\n".join(rel_lines)
+            joins_block += "\nUse these joins when needed.\n"
+
+        self._schema_cache = (schema_metadata, relationships, schema_block, joins_block)
+        return schema_block, joins_block
+
+    # ------------------------------------------------------------------
+    def _build_prompt(
+        self,
+        user_query: str,
+        schema_metadata,
+        relationships,
+        reasoning: bool = False,
+    ) -> str:
+        output_instruction = (
+            REASONING_OUTPUT_INSTRUCTION if reasoning else SQL_OUTPUT_INSTRUCTION
+        )
 
-            prompt += "\nAvailable JOIN paths:\n" + "\n".join(rel_lines)
-            prompt += "\nUse these joins when needed.\n"
+        schema_block, joins_block = self._schema_blocks(schema_metadata, relationships)
 
+        prompt = SQL_PROMPT.format(user_query=user_query, schema_block=schema_block)
+        prompt += joins_block
         prompt += f"\n{output_instruction}\n"
 
         return prompt
@@ -200,7 +276,7 @@ Schema:
         Basic validation: ensure SQL references known tables.
         """
         known_tables = {
-            t["table_name"] for t in schema_metadata if "table_name" in t
+            t["table_name"] for t in _schema_tables(schema_metadata) if "table_name" in t
         }
 
         sql_norm = re.sub(r'[`"\']', "", sql.lower())
@@ -230,8 +306,7 @@ Schema:
             reasoning,
         )
 
-        raw = self.llm.generate(prompt).strip()
-        raw = raw.replace("```", "").strip()
+        raw = _FENCE_RE.sub("", self.llm.generate(prompt)).strip()
 
         if raw.lower().startswith("json"):
             raw = raw[4:].strip()
@@ -258,10 +333,37 @@ Schema:
         # Apply DuckDB-specific fixes
         sql, _ = _fix_duckdb_date_arithmetic(sql)
         
-        # Validate
-        self._basic_sql_validation(sql, schema_metadata)
-        SQLValidator.validate(sql)
+        # Validate; a rejected answer must not come back from the cache on retry
+        try:
+            self._basic_sql_validation(sql, schema_metadata)
+            SQLValidator.validate(sql)
+        except Exception:
+            self._forget(prompt)
+            raise
 
         if reasoning:
             return {"sql_query": sql, "reasoning": reasoning_text}
-        return sql
\ No newline at end of file
+        return sql
+
+    def invalidate(
+        self,
+        user_query: str,
+        schema_metadata,
+        relationships,
+        reasoning: bool = False,
+    ) -> None:
+        """
+        Forget a cached LLM answer for these arguments so the next
+        generate_sql() call asks the model again. No-op without a cache.
+        """
+        self._forget(self._build_prompt(
+            user_query,
+            schema_metadata,
+            relationships,
+            reasoning,
+        ))
+
+    def _forget(self, prompt: str) -> None:
+        invalidate = getattr(self.llm, "invalidate", None)
+        if invalidate is not None:
+            invalidate(prompt)
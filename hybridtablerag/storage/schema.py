@@ -4,83 +4,245 @@ storage/schema.py
 Builds enriched schema context for LLM prompts.
 """
 
-from typing import Any, Dict, List
-import pandas as pd
+import datetime
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
 from hybridtablerag.storage.utils import _escape_identifier
+from hybridtablerag.storage.vectors import VectorStore
 
 CATEGORICAL_THRESHOLD = 25
+SAMPLE_VALUES = 3
+# Rows read once per table to collect sample values for every column
+SAMPLE_ROWS = 50
+# approx_count_distinct (HyperLogLog) can overshoot small counts by ~20%;
+# columns up to this factor over the threshold get an exact check
+APPROX_DISTINCT_MARGIN = 1.5
+
+
+def _identity(v):
+    return v
+
+
+# Exact type -> converter for the types DuckDB hands back most often;
+# one dict lookup instead of walking the isinstance chain
+_SERIALIZERS = {
+    type(None): _identity,
+    bool: _identity,
+    int: _identity,
+    float: _identity,
+    str: _identity,
+    datetime.date: datetime.date.isoformat,
+    datetime.datetime: datetime.datetime.isoformat,
+    Decimal: float,
+}
 
 
 def _safe_val(v):
-    import datetime
-    from decimal import Decimal
+    convert = _SERIALIZERS.get(type(v))
+    if convert is not None:
+        return convert(v)
+    return _safe_val_slow(v)
 
-    if v is None:
-        return None
 
+def _safe_val_slow(v):
+    # Subclasses (e.g. pd.Timestamp) and numpy scalars
     if isinstance(v, (datetime.date, datetime.datetime)):
         return v.isoformat()
 
     if isinstance(v, Decimal):
         return float(v)
 
-    try:
-        import numpy as np
-        if isinstance(v, (np.integer, np.floating)):
-            return v.item()
-    except Exception:
-        pass
+    if isinstance(v, (np.integer, np.floating)):
+        return v.item()
 
     return v
 
 
-def build_schema_context(conn, table_name: str, bts_log: List[str]) -> Dict[str, Any]:
+# Matched against the whole DESCRIBE type, so lists, structs and INTERVAL
+# are not mistaken for numbers (INT[] would break MIN/MAX/AVG)
+_NUMERIC_RE = re.compile(
+    r"U?(?:TINY|SMALL|BIG|HUGE)?INT(?:EGER)?|FLOAT|DOUBLE|REAL|DECIMAL(?:\(\d+,\s*\d+\))?",
+    re.IGNORECASE,
+)
+_DATE_RE = re.compile(
+    r"DATE|TIMESTAMP(?:_S|_MS|_NS)?(?: WITH TIME ZONE)?",
+    re.IGNORECASE,
+)
+
+
+def _column_kind(col_type: str):
+    """
+    Classify a DuckDB type as "numeric", "date" or None (anything else).
+    """
+    if _NUMERIC_RE.fullmatch(col_type):
+        return "numeric"
+    if _DATE_RE.fullmatch(col_type):
+        return "date"
+    return None
+
+
+def _fetch_columns(conn, table_names: List[str]) -> Dict[str, List[Tuple[str, str]]]:
+    """
+    (column_name, data_type) pairs for several tables from one catalog
+    query, in column order.
+    """
+    rows = conn.execute(
+        """
+        SELECT table_name, column_name, data_type
+        FROM information_schema.columns
+        WHERE table_catalog = current_database()
+          AND table_schema = 'main'
+          AND list_contains(?, table_name)
+        ORDER BY table_name, ordinal_position
+        """,
+        [list(table_names)],
+    ).fetchall()
+
+    columns: Dict[str, List[Tuple[str, str]]] = {}
+    for table_name, col, col_type in rows:
+        columns.setdefault(table_name, []).append((col, col_type))
+    return columns
+
+
+def _value_counts(conn, table_escaped: str, cols_escaped: List[str]) -> List[List[tuple]]:
+    """
+    (value, count) pairs for several columns from a single GROUPING SETS
+    scan, most frequent first; one list per column in `cols_escaped`.
+    """
+    grouping = ", ".join(f"GROUPING({c})" for c in cols_escaped)
+    sets = ", ".join(f"({c})" for c in cols_escaped)
+    rows = conn.execute(f"""
+        SELECT {grouping}, {", ".join(cols_escaped)}, COUNT(*) AS cnt
+        FROM {table_escaped}
+        GROUP BY GROUPING SETS ({sets})
+    """).fetchall()
+
+    n = len(cols_escaped)
+    counts: List[List[tuple]] = [[] for _ in cols_escaped]
+    for row in rows:
+        # The column this row was grouped on is the one with GROUPING() = 0
+        k = row.index(0, 0, n)
+        counts[k].append((row[n + k], row[-1]))
+    for col_counts in counts:
+        col_counts.sort(key=lambda vc: vc[1], reverse=True)
+    return counts
+
+
+def build_schema_context(
+    conn,
+    table_name: str,
+    bts_log: List[str],
+    exact_distinct: bool = False,
+    column_types: Optional[List[Tuple[str, str]]] = None,
+) -> Dict[str, Any]:
     """
     Build schema context for ONE table.
+
+    Row count, per-column null/distinct counts and numeric/date ranges all
+    come from a single aggregate query, i.e. one scan of the table.
+    Distinct counts use approx_count_distinct unless exact_distinct=True.
+    `column_types` takes (name, type) pairs already read from the catalog;
+    otherwise the table is DESCRIBEd.
     """
     table_escaped = _escape_identifier(table_name)
 
-    # --- row count ---
-    row_count = conn.execute(
-        f"SELECT COUNT(*) FROM {table_escaped}"
-    ).fetchone()[0]
-
     # --- schema ---
-    schema_rows = conn.execute(
-        f"DESCRIBE {table_escaped}"
-    ).fetchall()
+    if column_types:
+        schema_rows = column_types
+    else:
+        schema_rows = conn.execute(
+            f"DESCRIBE {table_escaped}"
+        ).fetchall()
+
+    # The stored embedding vector is internal to vector search; it has no
+    # useful stats and would put dim floats per sample into the prompt
+    schema_rows = [row for row in schema_rows if row[0] != VectorStore.EMBEDDING_COL]
 
     columns = [row[0] for row in schema_rows]
     columns_escaped = [_escape_identifier(col) for col in columns]
+    kinds = [_column_kind(row[1]) for row in schema_rows]
+
+    # --- row count + null / distinct counts + ranges (one scan) ---
+    count_exprs = ["COUNT(*)"]
+    for col_esc in columns_escaped:
+        count_exprs.append(f"COUNT(*) - COUNT({col_esc})")
+        if exact_distinct:
+            count_exprs.append(f"COUNT(DISTINCT {col_esc})")
+        else:
+            count_exprs.append(f"approx_count_distinct({col_esc})")
 
-    # --- null counts (batched) ---
-    null_exprs = [
-        f"SUM(CASE WHEN {col_esc} IS NULL THEN 1 ELSE 0 END) AS {col}_nulls"
-        for col, col_esc in zip(columns, columns_escaped)
-    ]
-    null_query = f"SELECT {', '.join(null_exprs)} FROM {table_escaped}"
-    null_counts = conn.execute(null_query).fetchone()
+    range_exprs = []
+    for col_esc, kind in zip(columns_escaped, kinds):
+        if kind == "numeric":
+            range_exprs += [f"MIN({col_esc})", f"MAX({col_esc})", f"AVG({col_esc})"]
+        elif kind == "date":
+            range_exprs += [f"MIN({col_esc})", f"MAX({col_esc})"]
 
-    # --- distinct counts (batched) ---
-    distinct_exprs = [
-        f"COUNT(DISTINCT {col_esc}) AS {col}_distinct"
-        for col, col_esc in zip(columns, columns_escaped)
+    has_ranges = True
+    try:
+        stats = conn.execute(
+            f"SELECT {', '.join(count_exprs + range_exprs)} FROM {table_escaped}"
+        ).fetchone()
+    except Exception as e:
+        bts_log.append(f"Failed to fetch ranges for {table_name}: {type(e).__name__}")
+        has_ranges = False
+        stats = conn.execute(
+            f"SELECT {', '.join(count_exprs)} FROM {table_escaped}"
+        ).fetchone()
+
+    row_count = stats[0]
+    categorical_limit = (
+        CATEGORICAL_THRESHOLD if exact_distinct
+        else int(CATEGORICAL_THRESHOLD * APPROX_DISTINCT_MARGIN)
+    )
+    range_pos = len(count_exprs)
+
+    # --- value counts for low-cardinality columns (one scan) ---
+    candidate_idx = [
+        i for i in range(len(columns)) if stats[2 + 2 * i] <= categorical_limit
     ]
-    distinct_query = f"SELECT {', '.join(distinct_exprs)} FROM {table_escaped}"
-    distinct_counts = conn.execute(distinct_query).fetchone()
+    value_counts: Dict[int, List[tuple]] = {}
+    if candidate_idx:
+        try:
+            fused = _value_counts(
+                conn, table_escaped, [columns_escaped[i] for i in candidate_idx]
+            )
+            value_counts = dict(zip(candidate_idx, fused))
+        except Exception as e:
+            # Fall back to one GROUP BY per column below
+            bts_log.append(f"Failed to fetch value counts for {table_name}: {type(e).__name__}")
 
     # --- sample ---
-    sample_df = conn.execute(
-        f"SELECT * FROM {table_escaped} LIMIT 3"
-    ).fetchdf()
+    # One short prefix read serves every column; only a sparse column that
+    # has too few non-null values in it is queried again below.
+    # fetchall() yields plain Python scalars, so no DataFrame or numpy
+    # conversion sits between DuckDB and the JSON-ready values
+    sample_rows = []
+    if columns_escaped:
+        sample_rows = conn.execute(
+            f"SELECT {', '.join(columns_escaped)} FROM {table_escaped} LIMIT {SAMPLE_ROWS}"
+        ).fetchall()
 
     col_contexts = []
 
     for i, col in enumerate(columns):
         col_esc = columns_escaped[i]
         col_type = schema_rows[i][1]
-        null_count = null_counts[i]
-        distinct_count = distinct_counts[i]
+        kind = kinds[i]
+        null_count = stats[1 + 2 * i]
+        # The HyperLogLog estimate can overshoot; a column never has more
+        # distinct values than non-null rows
+        distinct_count = min(stats[2 + 2 * i], row_count - null_count)
+
+        # Range values for this column, in the order they were selected
+        width = {"numeric": 3, "date": 2}.get(kind, 0)
+        col_range = stats[range_pos:range_pos + width]
+        range_pos += width
 
         col_ctx = {
             "name": col,
@@ -89,63 +251,65 @@ def build_schema_context(conn, table_name: str, bts_log: List[str]) -> Dict[str,
             "distinct": int(distinct_count),
         }
 
-        col_upper = col_type.upper()
-
         # --- categorical ---
-        if distinct_count <= CATEGORICAL_THRESHOLD:
+        # The value counts hold every distinct value, so they also settle an
+        # approximate count that landed near the threshold
+        is_categorical = False
+        if distinct_count <= categorical_limit:
             try:
-                dist_df = conn.execute(f"""
-                    SELECT {col_esc}, COUNT(*) as cnt
-                    FROM {table_escaped}
-                    GROUP BY {col_esc}
-                    ORDER BY cnt DESC
-                """).fetchdf()
-
-                col_ctx["all_values"] = [
-                    {"value": _safe_val(row[col]), "count": int(row["cnt"])}
-                    for _, row in dist_df.iterrows()
-                ]
+                dist_rows = value_counts.get(i)
+                if dist_rows is None:
+                    dist_rows = conn.execute(f"""
+                        SELECT {col_esc}, COUNT(*) as cnt
+                        FROM {table_escaped}
+                        GROUP BY {col_esc}
+                        ORDER BY cnt DESC
+                    """).fetchall()
+
+                exact_count = sum(1 for value, _ in dist_rows if value is not None)
+                col_ctx["distinct"] = exact_count
+
+                if exact_count <= CATEGORICAL_THRESHOLD:
+                    is_categorical = True
+                    col_ctx["all_values"] = [
+                        {"value": _safe_val(value), "count": cnt}
+                        for value, cnt in dist_rows
+                    ]
 
             except Exception as e:
+                is_categorical = True
                 bts_log.append(f"Failed to fetch distribution for {col}: {type(e).__name__}")
 
-        # --- numeric ---
-        elif any(t in col_upper for t in ["INT", "DOUBLE", "FLOAT", "DECIMAL", "BIGINT"]):
-            try:
-                stats = conn.execute(f"""
-                    SELECT MIN({col_esc}), MAX({col_esc}), AVG({col_esc})
-                    FROM {table_escaped}
-                """).fetchone()
-
-                col_ctx["range"] = {
-                    "min": _safe_val(stats[0]),
-                    "max": _safe_val(stats[1]),
-                    "avg": _safe_val(stats[2]),
-                }
-            except Exception as e:
-                bts_log.append(f"Failed to fetch stats for {col}: {type(e).__name__}")
-
-        # --- date ---
-        elif any(t in col_upper for t in ["DATE", "TIMESTAMP"]):
-            try:
-                stats = conn.execute(f"""
-                    SELECT MIN({col_esc}), MAX({col_esc})
-                    FROM {table_escaped}
-                """).fetchone()
-
-                col_ctx["range"] = {
-                    "min": _safe_val(stats[0]),
-                    "max": _safe_val(stats[1]),
-                }
-            except Exception as e:
-                bts_log.append(f"Failed to fetch date range for {col}: {type(e).__name__}")
-
-        # --- fallback sample ---
-        else:
-            if col in sample_df.columns:
-                col_ctx["sample_values"] = [
-                    _safe_val(v) for v in sample_df[col].dropna().tolist()
-                ]
+        if not is_categorical:
+            # --- numeric ---
+            if kind == "numeric":
+                if has_ranges:
+                    col_ctx["range"] = {
+                        "min": _safe_val(col_range[0]),
+                        "max": _safe_val(col_range[1]),
+                        "avg": _safe_val(col_range[2]),
+                    }
+
+            # --- date ---
+            elif kind == "date":
+                if has_ranges:
+                    col_ctx["range"] = {
+                        "min": _safe_val(col_range[0]),
+                        "max": _safe_val(col_range[1]),
+                    }
+
+            # --- fallback sample ---
+            else:
+                samples = [row[i] for row in sample_rows if row[i] is not None]
+                samples = samples[:SAMPLE_VALUES]
+                if len(samples) < SAMPLE_VALUES and row_count - null_count > len(samples):
+                    samples = [
+                        row[0] for row in conn.execute(
+                            f"SELECT {col_esc} FROM {table_escaped} "
+                            f"WHERE {col_esc} IS NOT NULL LIMIT {SAMPLE_VALUES}"
+                        ).fetchall()
+                    ]
+                col_ctx["sample_values"] = [_safe_val(v) for v in samples]
 
         col_contexts.append(col_ctx)
 
@@ -163,15 +327,44 @@ def build_multi_table_schema_context(
     table_names: List[str],
     relationships: List[dict],
     bts_log: List[str],
+    exact_distinct: bool = False,
+    max_workers: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
-    Multi-table schema context.
+    Multi-table schema context. Columns for every table are read with a
+    single information_schema query instead of one DESCRIBE per table.
+
+    Tables are profiled concurrently, each on its own cursor of `conn`;
+    max_workers=1 profiles them one after another on `conn` itself.
     """
-    tables_ctx = []
+    table_columns = _fetch_columns(conn, table_names) if table_names else {}
+    workers = min(len(table_names), max_workers or os.cpu_count() or 1)
+
+    def _build(t: str):
+        # Each worker logs into its own list; merged below in table order
+        log: List[str] = []
+        handle = conn if workers <= 1 else conn.cursor()
+        try:
+            ctx = build_schema_context(
+                handle, t, log,
+                exact_distinct=exact_distinct,
+                column_types=table_columns.get(t),
+            )
+        finally:
+            if handle is not conn:
+                handle.close()
+        return ctx, log
+
+    if workers <= 1:
+        results = [_build(t) for t in table_names]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_build, table_names))
 
-    for t in table_names:
-        ctx = build_schema_context(conn, t, bts_log)
+    tables_ctx = []
+    for ctx, log in results:
         tables_ctx.append(ctx)
+        bts_log.extend(log)
 
     return {
         "tables": tables_ctx,
@@ -5,27 +5,117 @@ DuckDB connection manager and table registration.
 """
 
 import os
+import re
+import threading
 import uuid
 import duckdb
-from typing import List
+from typing import Any, Dict, List, NamedTuple, Optional
 import pandas as pd
 from hybridtablerag.core.normalizer import NormalizationPlan
 from hybridtablerag.storage.utils import _escape_identifier
 
+# Statements that can change tables or their contents
+_WRITE_RE = re.compile(
+    r"^\s*(CREATE|INSERT|UPDATE|DELETE|DROP|ALTER|COPY)\b", re.IGNORECASE
+)
+
+class ColumnInfo(NamedTuple):
+    """
+    One DESCRIBE row; use attribute access, or _asdict() for a dict.
+    """
+    column_name: str
+    data_type: str
+    null: str
+    key: Optional[str]
+    default: Any
+    extra: Optional[str]
+
+
+# One open store per database file in this process
+_INSTANCES: Dict[str, "DuckDBStore"] = {}
+_INSTANCES_LOCK = threading.Lock()
+
+
+def _resolve_db_path(db_path: str) -> str:
+    project_root = os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "../../")
+    )
+    # Canonical form, so "x.duckdb", "./x.duckdb" and symlinks share one key
+    return os.path.realpath(os.path.join(project_root, db_path))
+
+
+def _configure_connection(conn: duckdb.DuckDBPyConnection) -> None:
+    """
+    Settings applied after the database is opened. The Parquet metadata
+    cache keeps decoded footers between queries over the same files.
+    DUCKDB_THREADS / DUCKDB_MEMORY_LIMIT override DuckDB's defaults
+    (all cores, 80% of RAM).
+
+    SET GLOBAL rather than a connect() config: cursors inherit the values,
+    and other connect() calls on the same file don't hit a config mismatch.
+    """
+    conn.execute("SET GLOBAL parquet_metadata_cache = true")
+    threads = int(os.getenv("DUCKDB_THREADS", "0"))
+    if threads > 0:
+        conn.execute(f"SET GLOBAL threads = {threads}")
+    memory_limit = os.getenv("DUCKDB_MEMORY_LIMIT")
+    if memory_limit:
+        conn.execute("SET GLOBAL memory_limit = ?", [memory_limit])
+
+
 class DuckDBStore:
     """
-    Central DuckDB connection. One instance per session.
+    Central DuckDB connection. One instance per database file: constructing
+    a store for a path that is already open returns the existing instance
+    instead of opening the file again. Use cursor() for per-thread handles.
     """
 
-    def __init__(self, db_path: str = "data/hybridtablerag.duckdb"):
-        project_root = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), "../../")
-        )
-        absolute_db_path = os.path.join(project_root, db_path)
-        os.makedirs(os.path.dirname(absolute_db_path), exist_ok=True)
+    def __new__(cls, db_path: str = "data/hybridtablerag.duckdb"):
+        absolute_db_path = _resolve_db_path(db_path)
+        with _INSTANCES_LOCK:
+            instance = _INSTANCES.get(absolute_db_path)
+            if instance is None:
+                instance = super().__new__(cls)
+                instance._initialized = False
+                _INSTANCES[absolute_db_path] = instance
+            return instance
 
-        self.db_path = absolute_db_path
-        self.conn = duckdb.connect(self.db_path)
+    def __init__(self, db_path: str = "data/hybridtablerag.duckdb"):
+        with _INSTANCES_LOCK:
+            if self._initialized:
+                return
+
+            absolute_db_path = _resolve_db_path(db_path)
+            try:
+                os.makedirs(os.path.dirname(absolute_db_path), exist_ok=True)
+                self.conn = duckdb.connect(absolute_db_path)
+                _configure_connection(self.conn)
+                # Terminal-only output; a per-connection setting
+                self.conn.execute("SET enable_progress_bar = false")
+            except Exception:
+                # Don't leave a half-built instance registered for this path
+                _INSTANCES.pop(absolute_db_path, None)
+                raise
+
+            self.db_path = absolute_db_path
+
+            # Bumped on every registration; cached metadata is only valid for
+            # the version it was built at
+            self.schema_version = 0
+            self._table_schemas: Dict[str, List[ColumnInfo]] = {}
+            self._relationships: Optional[List[dict]] = None
+            self._relationships_version = -1
+            # (csv path, mtime) -> {column: type} detected on first load
+            self._csv_types: Dict[tuple, Dict[str, str]] = {}
+            self._initialized = True
+
+    def invalidate_schema_cache(self) -> None:
+        """
+        Drop cached table metadata. Registration calls this automatically;
+        call it after DDL issued through another handle on self.conn.
+        """
+        self.schema_version += 1
+        self._table_schemas.clear()
 
     # Registration
 
@@ -54,6 +144,7 @@ class DuckDBStore:
                 f"CREATE OR REPLACE TABLE {_escape_identifier(table_name)} AS SELECT * FROM {_escape_identifier(tmp_name)}"
             )
             self.conn.unregister(tmp_name)
+            self.invalidate_schema_cache()
 
             bts_log.append(f"Registered table: {table_name} ({len(df)} rows)")
 
@@ -73,9 +164,51 @@ class DuckDBStore:
             f"CREATE OR REPLACE TABLE {_escape_identifier(table_name)} AS SELECT * FROM {_escape_identifier(tmp_name)}"
         )
         self.conn.unregister(tmp_name)
+        self.invalidate_schema_cache()
 
         bts_log.append(f"Registered table: {table_name} ({len(df)} rows)")
 
+    def register_csv(
+        self,
+        file_path: str,
+        table_name: str,
+        bts_log: list,
+        columns: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Load a CSV file straight into DuckDB with its parallel reader
+        (no cleaning/normalization). Pass `columns` ({name: type}) to skip
+        type detection; otherwise the types sniffed on the first load of
+        this file version are reused when it is registered again.
+        """
+        path = os.path.abspath(file_path)
+        key = (path, os.path.getmtime(path))
+        if columns is None:
+            columns = self._csv_types.get(key)
+
+        table_esc = _escape_identifier(table_name)
+        if columns:
+            self.conn.execute(
+                f"CREATE OR REPLACE TABLE {table_esc} AS "
+                f"SELECT * FROM read_csv(?, header = true, columns = ?)",
+                [path, columns],
+            )
+            self.invalidate_schema_cache()
+        else:
+            self.conn.execute(
+                f"CREATE OR REPLACE TABLE {table_esc} AS "
+                f"SELECT * FROM read_csv(?, header = true)",
+                [path],
+            )
+            self.invalidate_schema_cache()
+            self._csv_types[key] = {
+                col.column_name: col.data_type
+                for col in self.get_table_schema(table_name)
+            }
+
+        row_count = self.conn.execute(f"SELECT COUNT(*) FROM {table_esc}").fetchone()[0]
+        bts_log.append(f"Registered table: {table_name} ({row_count} rows)")
+
     # Metadata
 
     def list_tables(self) -> List[str]:
@@ -85,33 +218,71 @@ class DuckDBStore:
         result = self.conn.execute("SHOW TABLES").fetchall()
         return [row[0] for row in result]
 
-    def get_table_schema(self, table_name: str) -> List[dict]:
+    def get_row_counts(self, table_names: List[str]) -> Dict[str, int]:
         """
-        Return schema info.
+        Row count per table from one UNION ALL query. If that fails (e.g.
+        a table was dropped meanwhile) tables are counted one by one and
+        unreadable ones are reported as -1.
         """
+        if not table_names:
+            return {}
+
+        union_sql = " UNION ALL ".join(
+            f"SELECT ? AS tbl, COUNT(*) AS n FROM {_escape_identifier(t)}"
+            for t in table_names
+        )
+        try:
+            rows = self.conn.execute(union_sql, list(table_names)).fetchall()
+            return {t: int(n) for t, n in rows}
+        except Exception:
+            pass
+
+        row_counts = {}
+        for t in table_names:
+            try:
+                row_counts[t] = int(self.conn.execute(
+                    f"SELECT COUNT(*) FROM {_escape_identifier(t)}"
+                ).fetchone()[0])
+            except Exception:
+                row_counts[t] = -1
+        return row_counts
+
+    def get_table_schema(self, table_name: str) -> List[ColumnInfo]:
+        """
+        Return schema info. Cached per table until the next registration.
+        """
+        cached = self._table_schemas.get(table_name)
+        if cached is not None:
+            return cached
+
         result = self.conn.execute(f"DESCRIBE {_escape_identifier(table_name)}").fetchall()
 
-        columns = []
-        for row in result:
-            columns.append({
-                "column_name": row[0],
-                "data_type": row[1],
-                "null": row[2],
-                "key": row[3],
-                "default": row[4],
-                "extra": row[5],
-            })
+        columns = [ColumnInfo(*row[:6]) for row in result]
 
+        self._table_schemas[table_name] = columns
         return columns
 
     # Execution
 
-    def execute_query(self, sql: str) -> pd.DataFrame:
+    def execute_query(self, sql: str, params: Optional[list] = None, fmt: str = "df"):
         """
-        Execute SQL safely.
+        Execute SQL safely. Values should be passed as `params` and bound to
+        `?` placeholders rather than formatted into the SQL string.
+        DDL/DML statements invalidate cached schema metadata.
+
+        fmt="df" returns a pandas DataFrame; fmt="arrow" returns a
+        pyarrow.Table straight from DuckDB's columnar result, skipping the
+        pandas copy (requires pyarrow).
         """
+        if fmt not in ("df", "arrow"):
+            raise ValueError(f"Unsupported result format: {fmt!r} (expected 'df' or 'arrow')")
+
         try:
-            return self.conn.execute(sql).fetchdf()
+            cursor = self.conn.execute(sql, params)
+            result = cursor.fetch_arrow_table() if fmt == "arrow" else cursor.fetchdf()
+            if _WRITE_RE.match(sql):
+                self.invalidate_schema_cache()
+            return result
         except Exception as e:
             # Include query preview for debugging
             preview = sql[:200] + "..." if len(sql) > 200 else sql
@@ -124,61 +295,92 @@ class DuckDBStore:
     def infer_relationships(self) -> List[dict]:
         """
         Infer relationships based on column name + uniqueness heuristics.
+        Memoized until the schema version changes.
         """
-        relationships = []
-        tables = self.list_tables()
-
-        # Collect schema with escaped table names
-        schemas = {}
-        for t in tables:
-            schemas[t] = self.get_table_schema(t)
-
-        for t1 in tables:
-            for t2 in tables:
-                if t1 == t2:
-                    continue
-
-                cols1 = schemas[t1]
-                cols2 = schemas[t2]
-
-                for c1 in cols1:
-                    for c2 in cols2:
-                        if (
-                            c1["column_name"] == c2["column_name"]
-                            and c1["data_type"] == c2["data_type"]
-                        ):
-                            col = c1["column_name"]
-                            col_escaped = _escape_identifier(col)
-                            t2_escaped = _escape_identifier(t2)
-
-                            try:
-                                # Check uniqueness in t2
-                                unique_count = self.conn.execute(
-                                    f"SELECT COUNT(DISTINCT {col_escaped}) FROM {t2_escaped}"
-                                ).fetchone()[0]
-
-                                total_count = self.conn.execute(
-                                    f"SELECT COUNT(*) FROM {t2_escaped}"
-                                ).fetchone()[0]
-
-                                if unique_count == total_count and total_count > 0:
-                                    relationships.append({
-                                        "from_table": t1,
-                                        "from_column": col,
-                                        "to_table": t2,
-                                        "to_column": col,
-                                        "type": "many_to_one"
-                                    })
-
-                            except Exception as e:
-                                continue
-
-        return relationships
+        if self._relationships is not None and self._relationships_version == self.schema_version:
+            return list(self._relationships)
+
+        # Candidate pairs (same column name and type family in two tables)
+        # come from a single self-join on the catalog. Types are reduced to
+        # a family first so e.g. INTEGER joins BIGINT and DECIMAL(10,2)
+        # joins DECIMAL(18,3).
+        candidates = self.conn.execute("""
+            WITH cols AS (
+                SELECT
+                    table_name,
+                    column_name,
+                    ordinal_position,
+                    CASE
+                        WHEN regexp_full_match(data_type, 'U?(TINY|SMALL|BIG|HUGE)?INT(EGER)?') THEN 'INT'
+                        WHEN data_type LIKE 'DECIMAL%' THEN 'DECIMAL'
+                        WHEN data_type IN ('FLOAT', 'DOUBLE') THEN 'FLOAT'
+                        WHEN data_type LIKE 'TIMESTAMP%' THEN 'TIMESTAMP'
+                        ELSE data_type
+                    END AS type_family
+                FROM information_schema.columns
+                WHERE table_catalog = current_database()
+                  AND table_schema = 'main'
+                -- A name found in only one table can never pair up; drop
+                -- those before the type mapping and the self-join
+                QUALIFY COUNT(*) OVER (PARTITION BY column_name) > 1
+            )
+            SELECT a.table_name, b.table_name, a.column_name
+            FROM cols a
+            JOIN cols b
+              ON a.column_name = b.column_name
+             AND a.type_family = b.type_family
+             AND a.table_name <> b.table_name
+            ORDER BY a.table_name, b.table_name, a.ordinal_position
+        """).fetchall()
+
+        # Group candidate columns by target table so uniqueness is settled
+        # with one aggregate query per table rather than one per column
+        by_target: Dict[str, Dict[str, None]] = {}
+        for _, t2, col in candidates:
+            by_target.setdefault(t2, {})[col] = None
+
+        is_unique: Dict[tuple, bool] = {}
+        for t2, cols in by_target.items():
+            exprs = ", ".join(
+                f"COUNT(DISTINCT {_escape_identifier(c)})" for c in cols
+            )
+            try:
+                *unique_counts, total_count = self.conn.execute(
+                    f"SELECT {exprs}, COUNT(*) FROM {_escape_identifier(t2)}"
+                ).fetchone()
+            except Exception:
+                unique_counts, total_count = [None] * len(cols), 0
+            for col, unique_count in zip(cols, unique_counts):
+                is_unique[(t2, col)] = unique_count == total_count and total_count > 0
 
+        relationships = []
+        for t1, t2, col in candidates:
+            if is_unique[(t2, col)]:
+                relationships.append({
+                    "from_table": t1,
+                    "from_column": col,
+                    "to_table": t2,
+                    "to_column": col,
+                    "type": "many_to_one"
+                })
+
+        self._relationships = relationships
+        self._relationships_version = self.schema_version
+        return list(relationships)
+
+
+    def cursor(self):
+        """
+        A new handle on the same database for use from another thread.
+        """
+        return self.conn.cursor()
 
     # Cleanup
 
     def close(self):
+        with _INSTANCES_LOCK:
+            if _INSTANCES.get(self.db_path) is self:
+                del _INSTANCES[self.db_path]
         try:
             self.conn.close()
         except Exception:
@@ -4,12 +4,19 @@ storage/vectors.py
 DuckDB vector search using vss extension.
 """
 
+import logging
 import os
+import threading
+import uuid
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
 import pandas as pd
 from hybridtablerag.storage.utils import _escape_identifier
 
+log = logging.getLogger(__name__)
+
 
 # ─────────────────────────────────────────────────────────────
 # Embedding interface
@@ -19,6 +26,13 @@ class EmbeddingProvider(ABC):
     @abstractmethod
     def embed(self, texts: List[str]) -> List[List[float]]: pass
 
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeddings as a float32 (n, dim) matrix. Providers that already
+        produce arrays override this to skip the Python-list round trip.
+        """
+        return np.asarray(self.embed(texts), dtype=np.float32)
+
     @property
     @abstractmethod
     def dimension(self) -> int: pass
@@ -29,14 +43,49 @@ class EmbeddingProvider(ABC):
 # ─────────────────────────────────────────────────────────────
 
 class SentenceTransformerProvider(EmbeddingProvider):
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    # Above this many texts, encoding is spread over a multi-process pool
+    # (one worker per GPU, or several CPU workers)
+    MULTI_PROCESS_THRESHOLD = 10_000
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", backend: str = "torch", batch_size: Optional[int] = None):
         from sentence_transformers import SentenceTransformer
-        self.model = SentenceTransformer(model_name)
+        # backend="onnx" / "openvino" runs the exported graph through an
+        # optimized runtime instead of eager PyTorch. The keyword only exists
+        # in sentence-transformers >= 3.2, so the default is not passed.
+        if backend == "torch":
+            self.model = SentenceTransformer(model_name)
+        else:
+            self.model = SentenceTransformer(model_name, backend=backend)
+        self._on_cuda = str(self.model.device).startswith("cuda")
+        if backend == "torch" and self._on_cuda:
+            self.model.half()
+        # Larger batches are needed to keep a GPU busy
+        self.batch_size = batch_size or (128 if self._on_cuda else 64)
         self._dim = self.model.get_sentence_embedding_dimension()
 
     def embed(self, texts: List[str]) -> List[List[float]]:
-        embeddings = self.model.encode(texts, batch_size=64, show_progress_bar=False)
-        return embeddings.tolist()
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        if len(texts) > self.MULTI_PROCESS_THRESHOLD and self._use_pool():
+            embeddings = self._embed_multi_process(texts)
+        else:
+            embeddings = self.model.encode(texts, batch_size=self.batch_size, show_progress_bar=False)
+        return embeddings.astype(np.float32, copy=False)
+
+    def _use_pool(self) -> bool:
+        # A single GPU is already saturated by one process
+        import torch
+        return torch.cuda.device_count() != 1
+
+    def _embed_multi_process(self, texts: List[str]):
+        pool = self.model.start_multi_process_pool()
+        try:
+            return self.model.encode_multi_process(
+                texts, pool, batch_size=self.batch_size, chunk_size=5000
+            )
+        finally:
+            self.model.stop_multi_process_pool(pool)
 
     @property
     def dimension(self) -> int: return self._dim
@@ -71,7 +120,22 @@ def get_embedding_provider() -> EmbeddingProvider:
             api_key=os.getenv("AZURE_OPENAI_EMBEDDING_API_KEY"),
             endpoint=os.getenv("AZURE_OPENAI_EMBEDDING_ENDPOINT"),
         )
-    return SentenceTransformerProvider(os.getenv("SENTENCE_TRANSFORMER_MODEL", "all-MiniLM-L6-v2"))
+    return SentenceTransformerProvider(
+        os.getenv("SENTENCE_TRANSFORMER_MODEL", "all-MiniLM-L6-v2"),
+        backend=os.getenv("SENTENCE_TRANSFORMER_BACKEND", "torch"),
+        batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "0")) or None,
+    )
+
+
+def _l2_normalize_inplace(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scale each row of a float32 matrix to unit length, in place.
+    einsum computes the row norms without an N x d temporary.
+    """
+    norms = np.sqrt(np.einsum("ij,ij->i", vectors, vectors))
+    np.maximum(norms, 1e-12, out=norms)
+    vectors /= norms[:, None]
+    return vectors
 
 
 # ─────────────────────────────────────────────────────────────
@@ -80,19 +144,88 @@ def get_embedding_provider() -> EmbeddingProvider:
 
 class VectorStore:
     EMBEDDING_COL = "_embedding"
-
-    def __init__(self, conn, provider: EmbeddingProvider):
+    # The HNSW index only serves ORDER BY ... LIMIT queries whose distance
+    # function matches the index metric; anything else is a full scan.
+    # Vectors are unit-normalized on write, so inner product ranks the same
+    # as cosine without recomputing both norms per comparison.
+    INDEX_METRIC = "ip"
+    DISTANCE_FN = "array_negative_inner_product"
+    QUERY_CACHE_SIZE = 256
+
+    def __init__(self, conn, provider: EmbeddingProvider, hnsw_m: int = 16, ef_construction: int = 128, persist_hnsw: bool = False):
         self.conn = conn
         self.provider = provider
+        # HNSW indexes on a file-backed database need vss's experimental
+        # persistence mode, which has no WAL recovery for the index: a crash
+        # can corrupt the index or lose data in the same file. Off by
+        # default; an in-memory database gets the index either way. Without
+        # an index, embed_table() skips CREATE INDEX and search is an exact scan.
+        self.persist_hnsw = persist_hnsw
+        in_memory = conn.execute(
+            "SELECT path IS NULL FROM duckdb_databases() WHERE database_name = current_database()"
+        ).fetchone()[0]
+        self.use_hnsw = persist_hnsw or in_memory
+        # Graph degree and build-time beam width of new HNSW indexes:
+        # higher values give better recall for a larger, slower-to-build index
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # search() is called from concurrent API worker threads
+        self._cache_lock = threading.Lock()
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        return _l2_normalize_inplace(self.provider.embed_array(texts))
+
+    def _embed_queries(self, queries: List[str]) -> List[np.ndarray]:
+        """
+        Embed query strings, reusing cached vectors for repeat questions.
+        All cache misses go to the provider in a single batched call.
+        """
+        # Resolve the whole batch into a local map first, so evicting old
+        # entries below can never drop a vector this call still returns
+        found: Dict[str, np.ndarray] = {}
+        with self._cache_lock:
+            for q in queries:
+                if q not in found and q in self._query_cache:
+                    self._query_cache.move_to_end(q)
+                    found[q] = self._query_cache[q]
+
+        missing = list(dict.fromkeys(q for q in queries if q not in found))
+        if missing:
+            new_vectors = dict(zip(missing, self._embed(missing)))
+            found.update(new_vectors)
+            with self._cache_lock:
+                for q, vec in new_vectors.items():
+                    self._query_cache[q] = vec
+                    self._query_cache.move_to_end(q)
+                while len(self._query_cache) > self.QUERY_CACHE_SIZE:
+                    self._query_cache.popitem(last=False)
+
+        return [found[q] for q in queries]
 
     def setup(self):
         try:
             self.conn.execute("INSTALL vss")
             self.conn.execute("LOAD vss")
+            if self.persist_hnsw:
+                self.conn.execute("SET hnsw_enable_experimental_persistence = true")
         except Exception as e:
-            print(f"[VectorStore] Failed to load vss: {e}")
-
-    def embed_table(self, table_name: str, text_columns: List[str], pk_column: str, bts_log: list):
+            log.warning("Failed to load vss: %s", e)
+        if not self.use_hnsw:
+            log.info("HNSW disabled (file-backed database without persist_hnsw); vector search uses an exact scan")
+
+    def set_ef_search(self, ef_search: int):
+        """
+        Set the HNSW search beam width for this connection (vss default 64).
+        Raise for better recall, lower for faster top-k queries.
+        """
+        self.conn.execute(f"SET hnsw_ef_search = {int(ef_search)}")
+
+    def embed_table(self, table_name: str, text_columns: List[str], pk_column: str, bts_log: list, rebuild: bool = False):
+        """
+        Embed text columns into the table's embedding column. Rows that
+        already have a stored vector are skipped unless rebuild=True.
+        """
         if not text_columns or not pk_column:
             bts_log.append("Missing pk_column or text_columns for embedding")
             return
@@ -101,55 +234,97 @@ class VectorStore:
         pk_esc = _escape_identifier(pk_column)
         cols_esc = ", ".join(_escape_identifier(c) for c in text_columns)
 
-        df = self.conn.execute(f"SELECT {pk_esc}, {cols_esc} FROM {table_esc}").fetchdf()
+        has_embeddings = self.conn.execute("""
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_catalog = current_database()
+              AND table_schema = 'main'
+              AND table_name = ? AND column_name = ?
+        """, [table_name, self.EMBEDDING_COL]).fetchone()[0] > 0
+        where = f"WHERE {self.EMBEDDING_COL} IS NULL" if has_embeddings and not rebuild else ""
+
+        df = self.conn.execute(f"SELECT {pk_esc}, {cols_esc} FROM {table_esc} {where}").fetchdf()
         if df.empty:
             bts_log.append(f"No rows to embed in {table_name}")
             return
 
+        # Walk plain column lists rather than iterrows(), which builds a
+        # Series per row. Length-sorted batching happens inside encode().
         texts, pks = [], []
-        for _, row in df.iterrows():
-            parts = [f"{col}: {row[col]}" for col in text_columns if pd.notna(row[col])]
+        col_values = [df[col].tolist() for col in text_columns]
+        for pk, *values in zip(df[pk_column].tolist(), *col_values):
+            parts = [f"{col}: {v}" for col, v in zip(text_columns, values) if pd.notna(v)]
             if parts:
                 texts.append(" | ".join(parts))
-                pks.append(row[pk_column])
+                pks.append(pk)
 
         if not texts:
             bts_log.append("No valid text rows for embedding")
             return
 
-        vectors = self.provider.embed(texts)
+        vectors = self._embed(texts)
         dim = self.provider.dimension
 
         self.conn.execute(f"ALTER TABLE {table_esc} ADD COLUMN IF NOT EXISTS {self.EMBEDDING_COL} FLOAT[{dim}]")
-        self.conn.executemany(
-            f"UPDATE {table_esc} SET {self.EMBEDDING_COL} = ? WHERE {pk_esc} = ?",
-            list(zip(vectors, pks))
-        )
 
+        # One set-based UPDATE ... FROM a registered frame instead of one
+        # UPDATE (and one table scan) per row
+        tmp_name = f"_tmp_{uuid.uuid4().hex[:8]}"
+        self.conn.register(tmp_name, pd.DataFrame({"pk": pks, "vec": list(vectors)}))
         try:
-            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_vss ON {table_esc} USING HNSW ({self.EMBEDDING_COL}) WITH (metric='cosine')")
-        except Exception as e:
-            bts_log.append(f"HNSW index creation failed (non-critical): {e}")
+            self.conn.execute(f"""
+                UPDATE {table_esc} SET {self.EMBEDDING_COL} = src.vec::FLOAT[{dim}]
+                FROM {_escape_identifier(tmp_name)} AS src
+                WHERE {table_esc}.{pk_esc} = src.pk
+            """)
+        finally:
+            self.conn.unregister(tmp_name)
+
+        if self.use_hnsw:
+            index_esc = _escape_identifier(f"idx_{table_name}_vss")
+            try:
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS {index_esc} ON {table_esc} USING HNSW ({self.EMBEDDING_COL}) WITH (metric='{self.INDEX_METRIC}', M={int(self.hnsw_m)}, ef_construction={int(self.ef_construction)})")
+            except Exception as e:
+                bts_log.append(f"HNSW index creation failed (non-critical): {e}")
 
         bts_log.append(f"Embedded {len(vectors)} rows from {table_name}")
 
     def search(self, query: str, table_name: str, top_k: int = 10, sql_filter: Optional[str] = None) -> pd.DataFrame:
-        query_vec = self.provider.embed([query])[0]
+        query_vec = self._embed_queries([query])[0]
+        return self._search_vector(query_vec, table_name, top_k, sql_filter)
+
+    def search_many(self, queries: List[str], table_name: str, top_k: int = 10, sql_filter: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Search several queries against one table, encoding them in one batch.
+        """
+        vectors = self._embed_queries(queries)
+        return {
+            q: self._search_vector(vec, table_name, top_k, sql_filter)
+            for q, vec in zip(queries, vectors)
+        }
+
+    def _search_vector(self, query_vec: np.ndarray, table_name: str, top_k: int, sql_filter: Optional[str]) -> pd.DataFrame:
         dim = self.provider.dimension
         table_esc = _escape_identifier(table_name)
         where = f"WHERE {sql_filter}" if sql_filter else ""
 
-        df = self.conn.execute(f"""
-            SELECT *, array_distance({self.EMBEDDING_COL}, ?::FLOAT[{dim}]) AS similarity_score
+        # EXCLUDE keeps the vector column out of the result entirely rather
+        # than materializing dim floats per hit and dropping them in pandas.
+        # execute() binds the query vector before optimization, so the vss
+        # rewrite still sees a constant: EXPLAIN shows HNSW_INDEX_SCAN for
+        # this exact query when an index exists.
+        return self.conn.execute(f"""
+            SELECT * EXCLUDE ({self.EMBEDDING_COL}),
+                   {self.DISTANCE_FN}({self.EMBEDDING_COL}, ?::FLOAT[{dim}]) AS similarity_score
             FROM {table_esc} {where}
-            ORDER BY similarity_score ASC LIMIT {top_k}
+            ORDER BY similarity_score ASC LIMIT {int(top_k)}
         """, [query_vec]).fetchdf()
 
-        if self.EMBEDDING_COL in df.columns:
-            df = df.drop(columns=[self.EMBEDDING_COL])
-        return df
-
     def get_embedded_tables(self) -> List[str]:
-        result = self.conn.execute("SELECT DISTINCT table_name FROM information_schema.columns WHERE column_name = '_embedding'").fetchall()
+        result = self.conn.execute("""
+            SELECT DISTINCT table_name FROM information_schema.columns
+            WHERE table_catalog = current_database()
+              AND table_schema = 'main'
+              AND column_name = ?
+        """, [self.EMBEDDING_COL]).fetchall()
         return [row[0] for row in result]
 